@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import json
+import subprocess
+
+import pytest
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts'))
+
+import ai_doc_generator
+from ai_doc_generator import (AIDocumentationGenerator, NO_DOCUMENTATION_NEEDED,
+                              DIFF_TRUNCATED_NOTICE, _CatFile, _trim_partial_utf8)
+
+
+class _FakeResponse:
+    """Stands in for a streamed requests.Response"""
+
+    def __init__(self, lines=(), status_code=200, body=b''):
+        self.lines = lines
+        self.status_code = status_code
+        self.body = body
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def iter_lines(self):
+        for line in self.lines:
+            if isinstance(line, Exception):
+                raise line
+            yield line
+
+    def iter_content(self, chunk_size):
+        yield self.body[:chunk_size]
+
+
+def _openai_frame(text):
+    return b'data: ' + json.dumps({"choices": [{"delta": {"content": text}}]}).encode('utf-8')
+
+
+def _anthropic_frames(text):
+    return [b'event: content_block_delta',
+            b'data: ' + json.dumps({"type": "content_block_delta", "delta": {"type": "text_delta", "text": text}}).encode('utf-8'),
+            b'']
+
+
+def _generator(provider, response, monkeypatch):
+    monkeypatch.setenv('AI_DOC_NOCACHE', '1')
+    gen = AIDocumentationGenerator('KEY', provider)
+    monkeypatch.setattr(gen._session, 'post', lambda url, **kwargs: response)
+    return gen
+
+
+def _call(gen):
+    if gen.ai_provider == 'openai':
+        return gen._call_openai('prompt')
+    return gen._call_anthropic('prompt')
+
+
+def test_stream_openai_frames(monkeypatch):
+    lines = [b': keep-alive', _openai_frame("Hello, "), b'', _openai_frame("wiki é"),
+             b'data: {"choices": [{"delta": {}}]}', b'data: [DONE]']
+    assert _call(_generator('openai', _FakeResponse(lines), monkeypatch)) == "Hello, wiki é"
+
+
+def test_stream_anthropic_frames(monkeypatch):
+    lines = [b'event: message_start', b'data: {"type": "message_start", "message": {}}', b'',
+             *_anthropic_frames("## Orders"), *_anthropic_frames("\ntable"),
+             b'event: message_stop', b'data: {"type": "message_stop"}']
+    assert _call(_generator('anthropic', _FakeResponse(lines), monkeypatch)) == "## Orders\ntable"
+
+
+@pytest.mark.parametrize("provider", ["openai", "anthropic"])
+def test_stream_stops_at_sentinel_split_across_deltas(provider, monkeypatch):
+    frame = _openai_frame if provider == 'openai' else lambda text: _anthropic_frames(text)[1]
+    # Reading past the sentinel would hit the unparseable frame and fail the call
+    lines = [frame("  NO_DOCU"), frame("MENTATION_NEEDED"), b'data: {not json']
+    assert _call(_generator(provider, _FakeResponse(lines), monkeypatch)) == NO_DOCUMENTATION_NEEDED
+
+
+def test_stream_keeps_reply_that_only_starts_like_sentinel(monkeypatch):
+    lines = [_openai_frame("NO"), _openai_frame("TE: orders table"), b'data: [DONE]']
+    assert _call(_generator('openai', _FakeResponse(lines), monkeypatch)) == "NOTE: orders table"
+
+
+def test_stream_error_event(monkeypatch):
+    lines = [*_anthropic_frames("partial"), b'event: error',
+             b'data: {"type": "error", "error": {"type": "overloaded_error", "message": "Overloaded"}}']
+    assert _call(_generator('anthropic', _FakeResponse(lines), monkeypatch)) is None
+
+
+def test_stream_broken_connection(monkeypatch):
+    lines = [_openai_frame("partial"), requests.ConnectionError("reset")]
+    assert _call(_generator('openai', _FakeResponse(lines), monkeypatch)) is None
+
+
+def test_stream_non_200_status(monkeypatch, capsys):
+    response = _FakeResponse(status_code=401, body=b'{"error": "invalid x-api-key"}' + b' ' * 10_000)
+    assert _call(_generator('anthropic', response, monkeypatch)) is None
+    output = capsys.readouterr().out
+    assert "401" in output and "invalid x-api-key" in output
+    assert len(output) < 4096 + 100
+
+
+@pytest.mark.parametrize("text", ["plain ascii", "café", "€ 100", "ok \U0001F600", "é€\U0001F600"])
+def test_trim_partial_utf8(text):
+    data = text.encode('utf-8')
+    for cut in range(len(data) + 1):
+        trimmed = _trim_partial_utf8(data[:cut])
+        # The result decodes cleanly and keeps every complete character
+        decoded = trimmed.decode('utf-8')
+        assert text.startswith(decoded)
+        assert len(data[:cut]) - len(trimmed) < 4
+        assert decoded == data[:cut].decode('utf-8', errors='ignore')
+
+
+def _git(repo, *args, data=None):
+    env = {**os.environ, 'GIT_AUTHOR_NAME': 'Test', 'GIT_AUTHOR_EMAIL': 'test@example.com',
+           'GIT_COMMITTER_NAME': 'Test', 'GIT_COMMITTER_EMAIL': 'test@example.com'}
+    return subprocess.run(['git', *args], cwd=repo, env=env, input=data,
+                          capture_output=True, check=True).stdout
+
+
+@pytest.fixture
+def repo(tmp_path):
+    _git(tmp_path, 'init', '-q')
+    (tmp_path / 'schema.sql').write_text("CREATE TABLE posts (id INT);\n")
+    (tmp_path / 'notes.txt').write_text("notes\n" * 20)
+    _git(tmp_path, 'add', '.')
+    _git(tmp_path, 'commit', '-q', '-m', 'Initial schema')
+    (tmp_path / 'schema.sql').write_text("CREATE TABLE posts (id INT, subtitle TEXT);\n")
+    _git(tmp_path, 'mv', 'notes.txt', 'docs.txt')
+    _git(tmp_path, 'commit', '-q', '-am', 'Add subtitle column\n\nBody line')
+    return tmp_path
+
+
+def test_read_commit_with_git(repo, monkeypatch):
+    monkeypatch.chdir(repo)
+    gen = AIDocumentationGenerator('KEY', 'anthropic')
+    message, files_changed, diff_bytes = gen._read_commit_with_git('HEAD')
+    assert message == "Add subtitle column\n\nBody line"
+    assert files_changed == ['docs.txt', 'schema.sql']
+    assert diff_bytes.startswith(b'diff --git ')
+    assert b'+CREATE TABLE posts (id INT, subtitle TEXT);' in diff_bytes
+
+    message, files_changed, diff_bytes = gen._read_commit_with_git('HEAD~1')
+    assert message == "Initial schema"
+    assert files_changed == ['notes.txt', 'schema.sql']
+
+
+def test_read_commit_with_git_truncates(repo, monkeypatch):
+    monkeypatch.chdir(repo)
+    monkeypatch.setattr(ai_doc_generator, 'MAX_DIFF_BYTES', 400)
+    gen = AIDocumentationGenerator('KEY', 'anthropic')
+    message, files_changed, diff_bytes = gen._read_commit_with_git('HEAD~1')
+    assert message == "Initial schema"
+    assert files_changed == ['notes.txt', 'schema.sql']
+    assert diff_bytes.endswith(DIFF_TRUNCATED_NOTICE)
+    # The stat overview still lists the file the cut-off patch no longer shows
+    assert b'schema.sql' in diff_bytes.split(b'diff --git', 1)[0]
+
+
+def test_cat_file(repo):
+    binary = bytes(range(256)) + b'\n\n'
+    sha = _git(repo, 'hash-object', '-w', '--stdin', data=binary).decode().strip()
+    cat_file = _CatFile(str(repo))
+    try:
+        assert cat_file.read('HEAD:schema.sql') == b"CREATE TABLE posts (id INT, subtitle TEXT);\n"
+        assert cat_file.read('HEAD:missing.md') is None
+        assert cat_file.read(sha) == binary
+        # Replies stay in step after a miss and a binary object
+        assert cat_file.read('HEAD:docs.txt') == b"notes\n" * 20
+    finally:
+        cat_file.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__, "-q"]))
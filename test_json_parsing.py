@@ -1,48 +1,69 @@
 #!/usr/bin/env python3
 
-import re
+import os
+import sys
 import json
 
-def test_json_parsing():
-    # Test the JSON parsing logic with a sample response similar to what Claude returned
-    test_response = '''```json
-{
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts'))
+
+from ai_doc_generator import GitHubWikiAPI, parse_strategy_reply
+
+# Sample strategy body similar to what Claude returns, wrapped in each fence variant below
+_TEST_RESPONSE = '''{
   "needs_documentation": true,
   "reasoning": "Test",
   "documentation_strategy": {
     "action": "update_existing_page",
     "target_pages": ["Database Schema"]
   }
+}'''
+
+_FENCE_VARIANTS = {
+    "json-fence": f"```json\n{_TEST_RESPONSE}\n```",
+    "bare-fence": f"```\n{_TEST_RESPONSE}\n```",
+    "other-tag": f"```JSON\n{_TEST_RESPONSE}\n```",
+    # The strategy call stops generating at the closing fence
+    "stopped-at-fence": f"```json\n{_TEST_RESPONSE}",
+    "trailing-text": f"```json\n{_TEST_RESPONSE}\n```\nLet me know if you need anything else.",
+    "no-fence": _TEST_RESPONSE,
 }
-```'''
-
-    print("Original response:")
-    print(repr(test_response))
-    print()
-
-    # Apply the same cleaning logic from our script
-    cleaned_result = test_response.strip()
-    
-    if cleaned_result.startswith('```json'):
-        json_match = re.search(r'```json\s*\n(.*?)\n```', cleaned_result, re.DOTALL)
-        if json_match:
-            cleaned_result = json_match.group(1).strip()
-        else:
-            cleaned_result = cleaned_result.replace('```json', '').replace('```', '').strip()
-
-    print("Cleaned result:")
-    print(repr(cleaned_result))
-    print()
-
-    try:
-        strategy = json.loads(cleaned_result)
-        print("✅ Parsed successfully!")
-        print(f"Action: {strategy['documentation_strategy']['action']}")
-        print(f"Target pages: {strategy['documentation_strategy']['target_pages']}")
-        return True
-    except json.JSONDecodeError as e:
-        print(f"❌ JSON parsing failed: {e}")
-        return False
+
+
+@pytest.mark.parametrize("response", list(_FENCE_VARIANTS.values()), ids=list(_FENCE_VARIANTS))
+def test_json_parsing(response):
+    strategy = parse_strategy_reply(response)
+    assert strategy['documentation_strategy']['action'] == "update_existing_page"
+    assert strategy['documentation_strategy']['target_pages'] == ["Database Schema"]
+
+
+def test_json_parsing_rejects_non_json():
+    with pytest.raises(json.JSONDecodeError):
+        parse_strategy_reply("```json\nnot json\n```")
+
+
+
+class _FakeAI:
+    def __init__(self, reply):
+        self.reply = reply
+
+    def _call_ai_service(self, prompt, **kwargs):
+        return self.reply
+
+
+_EMPTY_WIKI = {'pages': {}, 'schema_pages': [], 'api_pages': [], 'data_flow_pages': []}
+
+
+@pytest.mark.parametrize("reply, action", [
+    (_FENCE_VARIANTS["json-fence"], "update_existing_page"),
+    ("I could not decide.", "create_new_page"),
+], ids=["parsed", "fallback"])
+def test_intelligent_documentation_strategy(reply, action):
+    wiki = GitHubWikiAPI("owner", "repo", "token")
+    strategy = wiki.intelligent_documentation_strategy({}, _EMPTY_WIKI, _FakeAI(reply))
+    assert strategy['documentation_strategy']['action'] == action
+
 
 if __name__ == "__main__":
-    test_json_parsing()
+    raise SystemExit(pytest.main([__file__, "-q"]))